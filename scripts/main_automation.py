@@ -3,19 +3,94 @@ EKS AI Automation Pipeline - Updated for Google Gemini API
 """
 
 import os
+import sys
+import functools
+import hashlib
+import asyncio
 import logging
+import logging.handlers
 import json
+import random
+import tempfile
+import time
 #import boto3
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 import re
-import yaml
+
+# Kubernetes manifest helpers: YAML document separators and the top-level kind field
+_DOC_SEPARATOR_RE = re.compile(r'^---\s*$', re.MULTILINE)
+_KIND_RE = re.compile(r'^kind:\s*([A-Za-z]+)\s*$', re.MULTILINE)
+
+# Free tier allows 5 requests per minute; calls are spaced at least this far apart
+# once free-tier pacing is enabled. _last_call_ts is the latest reserved call slot.
+_FREE_TIER_MIN_INTERVAL = 12.0
+_last_call_ts = 0.0
+
+# Realistic output ceilings per artifact; small artifacts finish sooner and
+# stay clear of tokens-per-minute limits
+_MAX_OUTPUT_TOKENS = {
+    'terraform_stage1_main': 16384,
+    'terraform_stage2_main': 16384,
+    'terraform_variables': 2048,
+    'kubernetes_manifests': 4096,
+    'github_actions_workflow': 4096,
+    'dockerfile': 1024,
+    'setup_script': 4096,
+    'deploy_script': 4096
+}
+
+def _extract_fenced(response: str) -> str:
+    """Return the body of the first fenced code block in a single pass
+
+    As in CommonMark, the whole opening fence line (including any info
+    string such as a language tag) is skipped. If the response has no
+    complete fenced block, the whole response is returned stripped.
+    """
+    start = response.find('```')
+    if start == -1:
+        return response.strip()
+    start += 3
+    
+    end = response.find('```', start)
+    if end == -1:
+        return response.strip()
+    
+    # Skip the rest of the opening fence line unless the block closes on it
+    line_end = response.find('\n', start, end)
+    if line_end != -1:
+        start = line_end + 1
+    
+    return response[start:end].strip()
+
+def _atomic_write(path: str, content: str, mode: int = 0o644):
+    """Write content to path in one buffered write, replacing the file atomically"""
+    data = content.encode('utf-8')
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.',
+        prefix=f".{os.path.basename(path)}.",
+        suffix='.tmp'
+    )
+    try:
+        with open(fd, 'wb', buffering=max(65536, len(data))) as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
 class EKSAutomationPipeline:
     def __init__(self, config_path: str = None):
         """Initialize the EKS automation pipeline with Gemini API"""
+        # Fail fast before touching the filesystem or the API
+        self._validate_env(config_path)
+        
+        # The log file handler needs its directory before logging is configured
+        Path('logs').mkdir(parents=True, exist_ok=True)
         self.setup_logging()
         self.logger = logging.getLogger(__name__)
         self.logger.info("EKS Automation Pipeline initialized")
@@ -32,16 +107,41 @@ class EKSAutomationPipeline:
         # Create required directories
         self._create_directories()
         
-        self.logger.info(f"Configuration loaded: {self.config}")
+        self.stats = {'hits': 0, 'misses': 0}
+        
+        self.logger.info("Configuration loaded: %s", self.config)
+
+    def _validate_env(self, config_path: str = None):
+        """Check required environment and configuration before any setup work"""
+        self._api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
+        if not self._api_key:
+            raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable not set")
+        if config_path and not os.path.exists(config_path):
+            raise FileNotFoundError(f"Config file not found: {config_path}")
 
     def setup_logging(self):
         """Setup logging configuration"""
+        # LOG_COMPACT=1 drops the timestamp, skipping the per-record strftime
+        if os.getenv('LOG_COMPACT') == '1':
+            formatter = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        
+        # Buffer file records and flush them in batches (or immediately on errors);
+        # the MemoryHandler hands records to its target, which does the formatting
+        file_handler = logging.FileHandler('logs/eks_automation.log')
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
         logging.basicConfig(
             level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler('logs/eks_automation.log'),
-                logging.StreamHandler()
+                logging.handlers.MemoryHandler(
+                    capacity=512,
+                    flushLevel=logging.ERROR,
+                    target=file_handler
+                ),
+                stream_handler
             ]
         )
 
@@ -53,8 +153,20 @@ class EKSAutomationPipeline:
             'node_js_repo': 'https://github.com/acemilyalcin/sample-node-project',
             'ecr_repository': f"{os.getenv('AWS_ACCOUNT_ID', '123456789012')}.dkr.ecr.{os.getenv('AWS_DEFAULT_REGION', 'us-east-1')}.amazonaws.com",
             'gemini_model': 'gemini-2.5-pro',
-            'max_tokens': 1048576,  # Increased for longer single file
+            'max_tokens': 1048576,  # Upper bound for any single call
+            # Added to per-artifact ceilings because thinking tokens count towards max_output_tokens
+            'thinking_token_headroom': 8192,
+            'max_retries': 5,
+            'retry_base_delay': 1.0,  # Seconds, doubled on every retry
+            # Pace calls for the 5 RPM free tier; also switched on when a 429 reports a free-tier quota
+            'free_tier': os.getenv('GEMINI_FREE_TIER', 'false').lower() == 'true',
             'temperature': 0.3,
+            'batch_mode': os.getenv('GEMINI_BATCH_MODE', 'false').lower() == 'true',
+            'batch_poll_interval': 30,  # Seconds between batch job status checks
+            'cache_dir': '.cache/gemini',
+            # Responses are only cached when temperature is 0 unless this override is set
+            'cache_nondeterministic': os.getenv('GEMINI_CACHE_ALL', 'false').lower() == 'true',
+            'cache_ttl': int(os.getenv('GEMINI_CACHE_TTL', '0')),  # Seconds, 0 disables expiry
             'vpc_cidr': '10.0.0.0/16',
             'node_instance_types': ['t3.medium'],
             'desired_capacity': 2,
@@ -72,17 +184,56 @@ class EKSAutomationPipeline:
     def _init_gemini_client(self):
         """Initialize Google Gemini client"""
         try:
-            api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable not set")
+            genai.configure(api_key=self._api_key)
             
-            genai.configure(api_key=api_key)
-            self.gemini_model = genai.GenerativeModel(self.config['gemini_model'])
+            # The configuration preamble is identical for every prompt, so it is
+            # sent once as the model's system instruction, a stable prefix that
+            # Gemini can cache implicitly, and each call only sends its tail
+            self._preamble = self._build_preamble()
+            
+            # Build the model eagerly so configuration errors surface here
+            self._get_model()
             self.logger.info("Gemini client initialized successfully")
         except Exception as e:
-            self.logger.error(f"Failed to initialize Gemini client: {str(e)}")
+            self.logger.error("Failed to initialize Gemini client: %s", e)
             raise
 
+    @functools.lru_cache(maxsize=1)
+    def _get_model(self) -> genai.GenerativeModel:
+        """Return the shared GenerativeModel
+
+        Create once, reuse always: every API call must go through this method
+        rather than constructing a GenerativeModel, so the model is built a
+        single time per pipeline and its client is reused across requests.
+        """
+        return genai.GenerativeModel(
+            self.config['gemini_model'],
+            system_instruction=self._preamble
+        )
+
+    def _build_preamble(self) -> str:
+        """Build the static instructions and configuration shared by every prompt"""
+        return f"""
+            You are a DevOps engineer generating production-ready files for deploying a
+            Node.js application on AWS EKS.
+        
+            CONFIGURATION:
+            - Cluster name: {self.config['cluster_name']}
+            - Region: {self.config['region']}
+            - VPC CIDR: {self.config['vpc_cidr']}
+            - Node instance types: {self.config['node_instance_types']}
+            - Desired capacity: {self.config['desired_capacity']}
+            - Min capacity: {self.config['min_capacity']}
+            - Max capacity: {self.config['max_capacity']}
+            - Node.js repository: {self.config['node_js_repo']}
+            - ECR registry: {self.config['ecr_repository']}
+        
+            CONVENTIONS:
+            - Follow AWS and Kubernetes best practices
+            - Include proper tagging on every AWS resource
+            - Return ONLY the requested file content, no explanations outside the code
+            """
+
     #def _init_aws_clients(self):
         #"""Initialize AWS clients"""
         #try:
@@ -99,42 +250,175 @@ class EKSAutomationPipeline:
         """Create required directories"""
         directories = [
             'terraform', 'k8s', 'scripts',
-            '.github/workflows', 'logs', 'sample-node-project'
+            '.github/workflows', 'logs', 'sample-node-project',
+            self.config['cache_dir']
         ]
         
-        for directory in directories:
+        created = []
+        cwd = os.getcwd()
+        for directory in dict.fromkeys(directories):
             Path(directory).mkdir(parents=True, exist_ok=True)
-            self.logger.info(f"Directory created/verified: {os.path.abspath(directory)}")
+            created.append(os.path.join(cwd, directory))
+        self.logger.debug("Ensured directories: %s", created)
+
+    def _output_token_limit(self, max_tokens: Optional[int] = None) -> int:
+        """Resolve the max_output_tokens for a call, capped by the configured upper bound"""
+        if max_tokens is None:
+            return self.config['max_tokens']
+        return min(max_tokens + self.config['thinking_token_headroom'], self.config['max_tokens'])
+
+    def _cache_path(self, prompt: str, max_output_tokens: int) -> Optional[Path]:
+        """Return the cache file for a prompt, or None if the response should not be cached"""
+        if self.config['temperature'] != 0 and not self.config['cache_nondeterministic']:
+            return None
+        key = hashlib.sha256(json.dumps({
+            'm': self.config['gemini_model'],
+            't': self.config['temperature'],
+            'mx': max_output_tokens,
+            's': self._preamble,
+            'p': prompt
+        }, sort_keys=True).encode('utf-8')).hexdigest()
+        return Path(self.config['cache_dir']) / f"{key}.txt"
 
-    def _call_gemini_api(self, prompt: str) -> str:
-        """Make API call to Gemini"""
+    def _read_cache(self, cache_path: Path) -> Optional[str]:
+        """Read a cached response, treating missing or expired entries as misses"""
         try:
-            response = self.gemini_model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.config['max_tokens'],
-                    temperature=self.config['temperature']
+            if self.config['cache_ttl'] and time.time() - cache_path.stat().st_mtime > self.config['cache_ttl']:
+                return None
+            return cache_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    async def _stream_and_extract_fenced(self, response) -> str:
+        """Accumulate a streamed response, stopping as soon as the first fenced block closes
+
+        The returned text ends at the closing fence, which the _extract_*
+        helpers handle exactly like a complete response. On early return the
+        chunk iterator is closed so no further chunks are read; the SDK has no
+        public way to cancel the RPC itself, which ends once the response is
+        released. If no fenced block closes, the full response is returned.
+        """
+        buffered = ""
+        opening = -1
+        chunks = aiter(response)
+        async for chunk in chunks:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks carrying only metadata or a finish reason have no text
+                continue
+            scanned = max(0, len(buffered) - 2)
+            buffered += text
+            
+            if opening == -1:
+                opening = buffered.find('```', scanned)
+                if opening == -1:
+                    continue
+                scanned = opening + 3
+            closing = buffered.find('```', max(scanned, opening + 3))
+            if closing != -1:
+                await chunks.aclose()
+                return buffered[:closing + 3]
+        
+        return buffered
+
+    async def _throttle(self):
+        """Space out calls on the free tier so they stay under its requests-per-minute limit"""
+        global _last_call_ts
+        if not self.config['free_tier']:
+            return
+        now = time.monotonic()
+        wait = max(0.0, _last_call_ts + _FREE_TIER_MIN_INTERVAL - now)
+        # Reserve the slot before sleeping so concurrent calls queue behind it
+        _last_call_ts = now + wait
+        if wait:
+            await asyncio.sleep(wait)
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        """Return the server-suggested retry delay in seconds, if the error carries one"""
+        for detail in getattr(error, 'details', None) or []:
+            retry_delay = getattr(detail, 'retry_delay', None)
+            if retry_delay is not None:
+                return retry_delay.seconds + retry_delay.nanos / 1e9
+        return None
+
+    async def _generate_with_retry(
+        self, prompt: str, max_output_tokens: int, stop_at_fence: bool
+    ) -> str:
+        """Stream a generation, retrying rate-limit and timeout errors with exponential backoff"""
+        base_delay = self.config['retry_base_delay']
+        # Always make at least one attempt, otherwise the loop would fall through and return None
+        attempts = max(1, self.config['max_retries'])
+        for attempt in range(attempts):
+            await self._throttle()
+            try:
+                response = await self._get_model().generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        max_output_tokens=max_output_tokens,
+                        temperature=self.config['temperature']
+                    ),
+                    stream=True
                 )
-            )
-            return response.text
-        except Exception as e:
-            self.logger.error(f"Gemini API call failed: {str(e)}")
-            raise
+                if stop_at_fence:
+                    return await self._stream_and_extract_fenced(response)
+                return "".join([chunk.text async for chunk in response if chunk.parts])
+            except google_exceptions.TooManyRequests as e:
+                # Covers gRPC ResourceExhausted and REST HTTP 429 alike
+                if attempt == attempts - 1:
+                    raise
+                # Free-tier quota errors name the exhausted metric, e.g.
+                # generate_content_free_tier_requests; paid-tier 429s stay unpaced
+                if not self.config['free_tier'] and 'free_tier' in str(e):
+                    self.logger.warning("Free-tier quota exhausted, pacing further calls")
+                    self.config['free_tier'] = True
+                delay = self._retry_after(e) or min(60, base_delay * 2 ** attempt)
+                delay += random.uniform(0, 0.5)
+                self.logger.warning("Gemini rate limited (attempt %s), retrying in %.1fs: %s", attempt + 1, delay, e)
+            except google_exceptions.DeadlineExceeded as e:
+                if attempt == attempts - 1:
+                    raise
+                delay = min(10, base_delay * 2 ** attempt / 2) + random.uniform(0, 0.5)
+                self.logger.warning("Gemini call timed out (attempt %s), retrying in %.1fs: %s", attempt + 1, delay, e)
+            await asyncio.sleep(delay)
 
-    def generate_complete_terraform_main(self) -> str:
-        """Generate complete Terraform main.tf file with all components"""
+    async def _call_gemini_api(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        stop_at_fence: bool = False
+    ) -> str:
+        """Make async streaming API call to Gemini, serving repeated prompts from the on-disk cache
+
+        Only the dynamic tail of the prompt is sent; the shared preamble is
+        attached to the model as its system instruction.
+        With stop_at_fence, generation is abandoned once the first fenced code
+        block is complete, for prompts that return a single block.
+        """
+        max_output_tokens = self._output_token_limit(max_tokens)
+        cache_path = self._cache_path(prompt, max_output_tokens)
+        if cache_path is not None:
+            cached = self._read_cache(cache_path)
+            if cached is not None:
+                self.stats['hits'] += 1
+                self.logger.info("Gemini response cache hit: %s", cache_path.name)
+                return cached
+            self.stats['misses'] += 1
+        
         try:
-            prompt1 = f"""
-            Generate a complete Terraform main.tf file for AWS EKS base infrastructure with the following specifications:
+            text = await self._generate_with_retry(prompt, max_output_tokens, stop_at_fence)
+        except Exception as e:
+            self.logger.error("Gemini API call failed: %s", e)
+            raise
         
-            CONFIGURATION:
-            - Cluster name: {self.config['cluster_name']}
-            - Region: {self.config['region']}
-            - VPC CIDR: {self.config['vpc_cidr']}
-            - Node instance types: {self.config['node_instance_types']}
-            - Desired capacity: {self.config['desired_capacity']}
-            - Min capacity: {self.config['min_capacity']}
-            - Max capacity: {self.config['max_capacity']}
+        if cache_path is not None:
+            _atomic_write(str(cache_path), text)
+        return text
+
+    def _terraform_main_prompts(self) -> Dict[str, str]:
+        """Build the Stage1 and Stage2 Terraform main.tf prompts, keyed by output file"""
+        prompt1 = """
+            Generate a complete Terraform main.tf file for AWS EKS base infrastructure using the configuration above.
         
             INCLUDE THE FOLLOWING COMPONENTS:
             1. Terraform providers (aws, tls)
@@ -159,16 +443,8 @@ class EKSAutomationPipeline:
             Return ONLY the complete Terraform code, no explanations or comments outside the code.
             """
         
-            response = self._call_gemini_api(prompt1)
-            terraform_content = self._extract_terraform_code(response)
-        
-            # Save to main.tf file
-            terraform_file = "terraform/Stage1/main.tf"
-            with open(terraform_file, 'w') as f:
-                f.write(terraform_content)
-    
-            #stage_2
-            prompt2 = f"""
+        #stage_2
+        prompt2 = f"""
             Generate a Terraform main.tf file to deploy the AWS ALB Controller on an existing EKS cluster with the following setup:
     
             ASSUMPTIONS:
@@ -195,44 +471,51 @@ class EKSAutomationPipeline:
             - Do not include VPC, EKS, or OIDC creation in this file
             - Follow AWS and Kubernetes best practices throughout
             """
-    
-            response = self._call_gemini_api(prompt2)
-            terraform_content = self._extract_terraform_code(response)
         
-            # Save to main.tf file
-            terraform_file = "terraform/Stage2/main.tf"
-            with open(terraform_file, 'w') as f:
-                f.write(terraform_content)
-    
+        return {
+            "terraform/Stage1/main.tf": prompt1,
+            "terraform/Stage2/main.tf": prompt2
+        }
+
+    def _save_terraform_main(self, terraform_file: str, response: str) -> str:
+        """Extract Terraform code from a response and save it as main.tf"""
+        terraform_content = self._extract_terraform_code(response)
+        _atomic_write(terraform_file, terraform_content)
+        self.logger.info("Generated complete Terraform main.tf: %s", terraform_file)
+        return terraform_content
+
+    async def generate_complete_terraform_main(self) -> Dict[str, str]:
+        """Generate complete Terraform main.tf file with all components"""
+        try:
+            prompts = self._terraform_main_prompts()
     
-            self.logger.info(f"Generated complete Terraform main.tf: {terraform_file}")
-            return terraform_content
+            # Both stages are independent, so request them concurrently
+            responses = await asyncio.gather(
+                *(
+                    self._call_gemini_api(prompt, _MAX_OUTPUT_TOKENS[artifact], stop_at_fence=True)
+                    for artifact, prompt in zip(
+                        ('terraform_stage1_main', 'terraform_stage2_main'), prompts.values()
+                    )
+                )
+            )
+        
+            # Save to main.tf files
+            return {
+                terraform_file: self._save_terraform_main(terraform_file, response)
+                for terraform_file, response in zip(prompts, responses)
+            }
     
         except Exception as e:
-            self.logger.error(f"Failed to generate complete Terraform main.tf: {str(e)}")
+            self.logger.error("Failed to generate complete Terraform main.tf: %s", e)
             raise
 
     def _extract_terraform_code(self, response: str) -> str:
         """Extract Terraform code from Gemini response"""
-        # Look for code blocks
-        code_patterns = [
-            r'```(?:terraform|hcl)?\n(.*?)\n```',
-            r'```\n(.*?)\n```',
-            r'```(.*?)```'
-        ]
-        
-        for pattern in code_patterns:
-            matches = re.findall(pattern, response, re.DOTALL)
-            if matches:
-                return matches[0].strip()
-        
-        # If no code blocks found, return the response as-is
-        return response.strip()
+        return _extract_fenced(response)
 
-    def generate_terraform_variables(self) -> str:
-        """Generate variables.tf file"""
-        try:
-            prompt = f"""
+    def _terraform_variables_prompt(self) -> str:
+        """Build the variables.tf prompt"""
+        return f"""
             Generate a Terraform variables.tf file for the EKS infrastructure with:
             - cluster_name (default: {self.config['cluster_name']})
             - region (default: {self.config['region']})
@@ -247,26 +530,34 @@ class EKSAutomationPipeline:
             Include proper descriptions and types for all variables.
             Return ONLY the Terraform variables code.
             """
-            
-            response = self._call_gemini_api(prompt)
-            variables_content = self._extract_terraform_code(response)
-            
-            # Save to variables.tf file
-            variables_file = "terraform/Stage1/variables.tf"
-            with open(variables_file, 'w') as f:
-                f.write(variables_content)
-            
-            self.logger.info(f"Generated Terraform variables.tf: {variables_file}")
-            return variables_content
+
+    def _save_terraform_variables(self, response: str) -> str:
+        """Extract Terraform code from a response and save it as variables.tf"""
+        variables_content = self._extract_terraform_code(response)
+        
+        # Save to variables.tf file
+        variables_file = "terraform/Stage1/variables.tf"
+        _atomic_write(variables_file, variables_content)
+        
+        self.logger.info("Generated Terraform variables.tf: %s", variables_file)
+        return variables_content
+
+    async def generate_terraform_variables(self) -> str:
+        """Generate variables.tf file"""
+        try:
+            response = await self._call_gemini_api(
+                self._terraform_variables_prompt(), _MAX_OUTPUT_TOKENS['terraform_variables'],
+                stop_at_fence=True
+            )
+            return self._save_terraform_variables(response)
             
         except Exception as e:
-            self.logger.error(f"Failed to generate Terraform variables.tf: {str(e)}")
+            self.logger.error("Failed to generate Terraform variables.tf: %s", e)
             raise
 
-    def generate_kubernetes_manifests(self) -> Dict[str, str]:
-        """Generate Kubernetes deployment manifests"""
-        try:
-            prompt = f"""
+    def _kubernetes_manifests_prompt(self) -> str:
+        """Build the Kubernetes manifests prompt"""
+        return f"""
             Generate Kubernetes YAML manifests for deploying a Node.js application on AWS EKS using ALB Ingress Controller.
  
                         Configuration:
@@ -320,58 +611,52 @@ class EKSAutomationPipeline:
                         - Separate them using `---`
                         - Output valid Kubernetes YAML
             """
-            
-            response = self._call_gemini_api(prompt)
-            
-            # Parse response to extract individual manifests
-            manifests = self._parse_k8s_manifests(response)
-            
-            # Save manifests to files
-            for name, content in manifests.items():
-                file_path = f"{name}.yaml"
-                with open(file_path, 'w') as f:
-                    f.write(content)
-                self.logger.info(f"Generated Kubernetes manifest: {file_path}")
-            
-            return manifests
+
+    def _save_kubernetes_manifests(self, response: str) -> Dict[str, str]:
+        """Split a response into individual manifests and save each one"""
+        # Parse response to extract individual manifests
+        manifests = self._parse_k8s_manifests(response)
+        
+        # Save manifests to files
+        for name, content in manifests.items():
+            file_path = f"{name}.yaml"
+            _atomic_write(file_path, content)
+            self.logger.info("Generated Kubernetes manifest: %s", file_path)
+        
+        return manifests
+
+    async def generate_kubernetes_manifests(self) -> Dict[str, str]:
+        """Generate Kubernetes deployment manifests"""
+        try:
+            response = await self._call_gemini_api(
+                self._kubernetes_manifests_prompt(), _MAX_OUTPUT_TOKENS['kubernetes_manifests']
+            )
+            return self._save_kubernetes_manifests(response)
             
         except Exception as e:
-            self.logger.error(f"Failed to generate Kubernetes manifests: {str(e)}")
+            self.logger.error("Failed to generate Kubernetes manifests: %s", e)
             raise
 
     def _parse_k8s_manifests(self, response: str) -> Dict[str, str]:
         """Parse Kubernetes manifests from response"""
         manifests = {}
         
-        # Split by --- (YAML document separator)
-        docs = response.split('---')
-        
-        for doc in docs:
+        # Only the top-level kind is needed, so no YAML parsing is done
+        for doc in _DOC_SEPARATOR_RE.split(self._extract_yaml_content(response)):
             doc = doc.strip()
             if not doc:
                 continue
-            
-            try:
-                # Try to parse as YAML to get kind
-                yaml_doc = yaml.safe_load(doc)
-                if yaml_doc and 'kind' in yaml_doc:
-                    kind = yaml_doc['kind'].lower()
-                    manifests[kind] = doc
-            except:
-                # If parsing fails, use generic naming
-                if 'Deployment' in doc:
-                    manifests['deployment'] = doc
-                elif 'Service' in doc:
-                    manifests['service'] = doc
-                elif 'Ingress' in doc:
-                    manifests['ingress'] = doc
+            match = _KIND_RE.search(doc)
+            if match:
+                manifests[match.group(1).lower()] = doc
+            else:
+                self.logger.warning("Skipping Kubernetes manifest without a recognizable kind: %.80r", doc)
         
         return manifests
 
-    def generate_github_actions_workflow(self) -> str:
-        """Generate GitHub Actions workflow"""
-        try:
-            prompt = f"""
+    def _github_actions_workflow_prompt(self) -> str:
+        """Build the GitHub Actions workflow prompt"""
+        return f"""
             Write a GitHub Actions workflow in YAML that:
                 
                 1. Builds a Docker image from the project root
@@ -392,41 +677,37 @@ class EKSAutomationPipeline:
                 
                 Respond with only the content of `.github/workflows/deploy.yml`. No markdown or explanation.
             """
-            
-            response = self._call_gemini_api(prompt)
-            workflow_content = self._extract_yaml_content(response)
-            
-            # Save workflow file
-            workflow_path = ".github/workflows/deploy.yml"
-            with open(workflow_path, 'w') as f:
-                f.write(workflow_content)
-            
-            self.logger.info(f"Generated GitHub Actions workflow: {workflow_path}")
-            return workflow_content
+
+    def _save_github_actions_workflow(self, response: str) -> str:
+        """Extract YAML from a response and save it as the deploy workflow"""
+        workflow_content = self._extract_yaml_content(response)
+        
+        # Save workflow file
+        workflow_path = ".github/workflows/deploy.yml"
+        _atomic_write(workflow_path, workflow_content)
+        
+        self.logger.info("Generated GitHub Actions workflow: %s", workflow_path)
+        return workflow_content
+
+    async def generate_github_actions_workflow(self) -> str:
+        """Generate GitHub Actions workflow"""
+        try:
+            response = await self._call_gemini_api(
+                self._github_actions_workflow_prompt(), _MAX_OUTPUT_TOKENS['github_actions_workflow']
+            )
+            return self._save_github_actions_workflow(response)
             
         except Exception as e:
-            self.logger.error(f"Failed to generate GitHub Actions workflow: {str(e)}")
+            self.logger.error("Failed to generate GitHub Actions workflow: %s", e)
             raise
 
     def _extract_yaml_content(self, response: str) -> str:
         """Extract YAML content from response"""
-        # Look for YAML code blocks
-        yaml_patterns = [
-            r'```(?:yaml|yml)?\n(.*?)\n```',
-            r'```\n(.*?)\n```'
-        ]
-        
-        for pattern in yaml_patterns:
-            matches = re.findall(pattern, response, re.DOTALL)
-            if matches:
-                return matches[0].strip()
-        
-        return response.strip()
+        return _extract_fenced(response)
 
-    def generate_dockerfile(self) -> str:
-        """Generate Dockerfile for Node.js application"""
-        try:
-            prompt = """
+    def _dockerfile_prompt(self) -> str:
+        """Build the Dockerfile prompt"""
+        return """
            Generate a Dockerfile for a Node.js application that:
                 
                 1.Uses node:18-slim as the base image
@@ -442,44 +723,38 @@ class EKSAutomationPipeline:
                 ⚠️ Do not include any explanation or "Before running" section.
                 ⚠️ Just return clean, executable DOCKERFILE code only.
             """
-            
-            response = self._call_gemini_api(prompt)
-            dockerfile_content = self._extract_dockerfile_content(response)
-            
-            # Save Dockerfile
-            dockerfile_path = "Dockerfile"
-            with open(dockerfile_path, 'w') as f:
-                f.write(dockerfile_content)
-            
-            self.logger.info(f"Generated Dockerfile: {dockerfile_path}")
-            return dockerfile_content
+
+    def _save_dockerfile(self, response: str) -> str:
+        """Extract Dockerfile content from a response and save it"""
+        dockerfile_content = self._extract_dockerfile_content(response)
+        
+        # Save Dockerfile
+        dockerfile_path = "Dockerfile"
+        _atomic_write(dockerfile_path, dockerfile_content)
+        
+        self.logger.info("Generated Dockerfile: %s", dockerfile_path)
+        return dockerfile_content
+
+    async def generate_dockerfile(self) -> str:
+        """Generate Dockerfile for Node.js application"""
+        try:
+            response = await self._call_gemini_api(
+                self._dockerfile_prompt(), _MAX_OUTPUT_TOKENS['dockerfile'], stop_at_fence=True
+            )
+            return self._save_dockerfile(response)
             
         except Exception as e:
-            self.logger.error(f"Failed to generate Dockerfile: {str(e)}")
+            self.logger.error("Failed to generate Dockerfile: %s", e)
             raise
 
     def _extract_dockerfile_content(self, response: str) -> str:
         """Extract Dockerfile content from response"""
-        # Look for Dockerfile code blocks
-        dockerfile_patterns = [
-            r'```(?:dockerfile|docker)?\n(.*?)\n```',
-            r'```\n(.*?)\n```'
-        ]
-        
-        for pattern in dockerfile_patterns:
-            matches = re.findall(pattern, response, re.DOTALL)
-            if matches:
-                return matches[0].strip()
-        
-        return response.strip()
+        return _extract_fenced(response)
 
-    def generate_deployment_scripts(self) -> Dict[str, str]:
-        """Generate deployment and setup scripts"""
-        try:
-            scripts = {}
-            
-            # Generate setup script
-            setup_prompt = f"""
+    def _deployment_script_prompts(self) -> Dict[str, str]:
+        """Build the setup and deploy script prompts, keyed by script name"""
+        # Generate setup script
+        setup_prompt = f"""
             Generate a bash script for setting up the EKS environment with:
             - AWS CLI configuration check
             - kubectl installation check
@@ -491,13 +766,9 @@ class EKSAutomationPipeline:
             
             Script should be production-ready with error handling.
             """
-            
-            setup_response = self._call_gemini_api(setup_prompt)
-            setup_content = self._extract_script_content(setup_response)
-            scripts['setup'] = setup_content
-            
-            # Generate deploy script
-            deploy_prompt = f"""
+        
+        # Generate deploy script
+        deploy_prompt = f"""
             Generate a bash script for deploying the Node.js application with:
             - Build Docker image
             - Push to ECR
@@ -508,120 +779,253 @@ class EKSAutomationPipeline:
             
             Script should include proper error handling and logging.
             """
+        
+        return {'setup': setup_prompt, 'deploy': deploy_prompt}
+
+    def _save_deployment_script(self, script_name: str, response: str) -> str:
+        """Extract a script from a response and save it as an executable file"""
+        content = self._extract_script_content(response)
+        script_path = f"scripts/{script_name}.sh"
+        # Make script executable
+        _atomic_write(script_path, content, mode=0o755)
+        self.logger.info("Generated script: %s", script_path)
+        return content
+
+    async def generate_deployment_scripts(self) -> Dict[str, str]:
+        """Generate deployment and setup scripts"""
+        try:
+            prompts = self._deployment_script_prompts()
             
-            deploy_response = self._call_gemini_api(deploy_prompt)
-            deploy_content = self._extract_script_content(deploy_response)
-            scripts['deploy'] = deploy_content
+            responses = await asyncio.gather(
+                *(
+                    self._call_gemini_api(prompt, _MAX_OUTPUT_TOKENS[f"{script_name}_script"])
+                    for script_name, prompt in prompts.items()
+                )
+            )
             
             # Save scripts
-            for script_name, content in scripts.items():
-                script_path = f"scripts/{script_name}.sh"
-                with open(script_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                # Make script executable
-                os.chmod(script_path, 0o755)
-                self.logger.info(f"Generated script: {script_path}")
-            
-            return scripts
+            return {
+                script_name: self._save_deployment_script(script_name, response)
+                for script_name, response in zip(prompts, responses)
+            }
             
         except Exception as e:
-            self.logger.error(f"Failed to generate deployment scripts: {str(e)}")
+            self.logger.error("Failed to generate deployment scripts: %s", e)
             raise
 
     def _extract_script_content(self, response: str) -> str:
         """Extract script content from response"""
-        # Look for bash/shell code blocks
-        script_patterns = [
-            r'```(?:bash|sh|shell)?\n(.*?)\n```',
-            r'```\n(.*?)\n```'
-        ]
-        
-        for pattern in script_patterns:
-            matches = re.findall(pattern, response, re.DOTALL)
-            if matches:
-                return matches[0].strip()
-        
-        return response.strip()
+        return _extract_fenced(response)
 
     def run_full_pipeline(self):
-        """Run the complete automation pipeline"""
+        """Run the complete automation pipeline
+
+        google-generativeai binds its async client to the first event loop
+        that uses it, so call this at most once per process; async callers
+        should await run_full_pipeline_async() instead.
+        """
+        asyncio.run(self.run_full_pipeline_async())
+
+    async def run_full_pipeline_async(self):
+        """Run the complete automation pipeline, generating all artifacts concurrently"""
         try:
             self.logger.info("Starting full automation pipeline")
             
-            # Generate single complete Terraform main.tf
-            self.logger.info("Generating complete Terraform main.tf")
-            self.generate_complete_terraform_main()
+            # Every artifact is generated independently, so the Gemini calls
+            # are dispatched together and wall time is bound by the slowest one
+            self.logger.info("Generating Terraform, Kubernetes, workflow, Dockerfile and scripts")
+            await asyncio.gather(
+                self.generate_complete_terraform_main(),
+                self.generate_terraform_variables(),
+                self.generate_kubernetes_manifests(),
+                self.generate_github_actions_workflow(),
+                self.generate_dockerfile(),
+                self.generate_deployment_scripts()
+            )
             
-            # Generate Terraform variables and outputs
-            self.logger.info("Generating Terraform variables.tf")
-            self.generate_terraform_variables()
+            self.logger.info("Gemini response cache stats: %s", self.stats)
+            self.logger.info("Full automation pipeline completed successfully")
+            self._print_completion_summary()
             
+        except Exception as e:
+            self.logger.error("Pipeline failed: %s", e)
+            raise
+
+    def _batch_artifacts(self) -> Dict[str, Tuple[str, Callable[[str], Any]]]:
+        """Map each logical artifact name to its prompt and the handler that saves its response"""
+        terraform_main = self._terraform_main_prompts()
+        scripts = self._deployment_script_prompts()
+        return {
+            'terraform_stage1_main': (
+                terraform_main["terraform/Stage1/main.tf"],
+                lambda response: self._save_terraform_main("terraform/Stage1/main.tf", response)
+            ),
+            'terraform_stage2_main': (
+                terraform_main["terraform/Stage2/main.tf"],
+                lambda response: self._save_terraform_main("terraform/Stage2/main.tf", response)
+            ),
+            'terraform_variables': (self._terraform_variables_prompt(), self._save_terraform_variables),
+            'kubernetes_manifests': (self._kubernetes_manifests_prompt(), self._save_kubernetes_manifests),
+            'github_actions_workflow': (self._github_actions_workflow_prompt(), self._save_github_actions_workflow),
+            'dockerfile': (self._dockerfile_prompt(), self._save_dockerfile),
+            'setup_script': (
+                scripts['setup'],
+                lambda response: self._save_deployment_script('setup', response)
+            ),
+            'deploy_script': (
+                scripts['deploy'],
+                lambda response: self._save_deployment_script('deploy', response)
+            )
+        }
+
+    def _write_batch_requests(self, prompts: Dict[str, str]) -> str:
+        """Write prompts as a Gemini Batch Mode JSONL request file"""
+        jsonl_path = f"logs/gemini_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            for key, prompt in prompts.items():
+                request = {
+                    'key': key,
+                    'request': {
+                        'system_instruction': {'parts': [{'text': self._preamble}]},
+                        'contents': [{'parts': [{'text': prompt}]}],
+                        'generation_config': {
+                            'max_output_tokens': self._output_token_limit(_MAX_OUTPUT_TOKENS.get(key)),
+                            'temperature': self.config['temperature']
+                        }
+                    }
+                }
+                f.write(json.dumps(request) + "\n")
+        return jsonl_path
 
-            # Generate Kubernetes manifests
-            self.logger.info("Generating Kubernetes manifests")
-            self.generate_kubernetes_manifests()
+    def run_full_pipeline_batch(self):
+        """Run the complete automation pipeline as a single Gemini Batch Mode job
+
+        Batch jobs are billed at half the standard rate and are not subject to
+        per-minute request limits, at the cost of turnaround of up to 24 hours.
+        """
+        try:
+            from google import genai as genai_sdk
+            from google.genai import types as genai_types
+        except ImportError as e:
+            raise ImportError("Batch mode requires the google-genai package: pip install google-genai") from e
+        
+        try:
+            self.logger.info("Starting full automation pipeline in batch mode")
             
-            # Generate GitHub Actions workflow
-            self.logger.info("Generating GitHub Actions workflow")
-            self.generate_github_actions_workflow()
+            artifacts = self._batch_artifacts()
+            jsonl_path = self._write_batch_requests(
+                {key: prompt for key, (prompt, _) in artifacts.items()}
+            )
             
-            # Generate Dockerfile
-            self.logger.info("Generating Dockerfile")
-            self.generate_dockerfile()
+            client = genai_sdk.Client(api_key=self._api_key)
+            uploaded = client.files.upload(
+                file=jsonl_path,
+                config=genai_types.UploadFileConfig(display_name=Path(jsonl_path).stem, mime_type='jsonl')
+            )
+            job = client.batches.create(model=self.config['gemini_model'], src=uploaded.name)
+            self.logger.info("Submitted batch job %s with %s requests", job.name, len(artifacts))
             
-            # Generate deployment scripts
-            self.logger.info("Generating deployment scripts")
-            self.generate_deployment_scripts()
+            finished_states = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+            while job.state.name not in finished_states:
+                time.sleep(self.config['batch_poll_interval'])
+                job = client.batches.get(name=job.name)
+                self.logger.info("Batch job %s state: %s", job.name, job.state.name)
+            
+            if job.state.name != 'JOB_STATE_SUCCEEDED':
+                raise RuntimeError(f"Batch job {job.name} finished with state {job.state.name}")
+            
+            results = client.files.download(file=job.dest.file_name).decode('utf-8')
+            
+            # Validate every result before writing any file, so a failed request
+            # never leaves a partially regenerated tree behind
+            responses = {}
+            for line in results.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                key = result.get('key')
+                if key not in artifacts:
+                    self.logger.warning("Ignoring batch result for unknown artifact: %s", key)
+                    continue
+                if 'response' not in result:
+                    raise RuntimeError(f"Batch request for {key} failed: {result.get('error')}")
+                candidates = result['response'].get('candidates') or []
+                content = candidates[0].get('content') if candidates else None
+                if not content or not content.get('parts'):
+                    finish_reason = candidates[0].get('finishReason') if candidates else None
+                    raise RuntimeError(f"Batch request for {key} returned no content (finish reason: {finish_reason})")
+                responses[key] = ''.join(part.get('text', '') for part in content['parts'])
+            
+            missing = sorted(set(artifacts) - set(responses))
+            if missing:
+                raise RuntimeError(f"Batch job {job.name} returned no result for: {', '.join(missing)}")
+            
+            for key, response in responses.items():
+                _, save = artifacts[key]
+                save(response)
             
             self.logger.info("Full automation pipeline completed successfully")
             self._print_completion_summary()
             
         except Exception as e:
-            self.logger.error(f"Pipeline failed: {str(e)}")
+            self.logger.error("Batch pipeline failed: %s", e)
             raise
 
     def _print_completion_summary(self):
         """Print completion summary"""
-        print("\n" + "="*60)
-        print("🎉 EKS AUTOMATION PIPELINE COMPLETED SUCCESSFULLY!")
-        print("="*60)
-        print("\nGenerated Files:")
-        print("📁 terraform/")
-        print("   ├── Stage1/")
-        print("       ├── main.tf         (Complete infrastructure)")
-        print("       └── variables.tf    (Input variables)")
-        print("   └── Stage2/")
-        print("       └── main.tf         (ALB Controller setup)")
-        print("\n")
-        print("   ├── deployment.yaml (Application deployment)")
-        print("   ├── service.yaml    (Service configuration)")
-        print("   └── ingress.yaml    (Ingress configuration)")
-        print("\n📁 .github/workflows/")
-        print("   └── deploy.yml      (CI/CD pipeline)")
-        print("\n📁 scripts/")
-        print("   ├── setup.sh        (Environment setup)")
-        print("   └── deploy.sh       (Application deployment)")
-        print("\n")
-        print("   └── Dockerfile      (Container configuration)")
-        print("\n" + "="*60)
-        print("Next Steps:")
-        print("1. Review and customize the generated files")
-        print("2. Set up AWS credentials and environment variables")
-        print("3. Run: cd terraform && terraform init && terraform plan")
-        print("4. Run: terraform apply")
-        print("5. Configure kubectl: aws eks update-kubeconfig --region <region> --name <cluster-name>")
-        print("6. Deploy application: kubectl apply -f k8s/")
-        print("="*60)
+        lines = [
+            "\n" + "="*60,
+            "🎉 EKS AUTOMATION PIPELINE COMPLETED SUCCESSFULLY!",
+            "="*60,
+            "\nGenerated Files:",
+            "📁 terraform/",
+            "   ├── Stage1/",
+            "       ├── main.tf         (Complete infrastructure)",
+            "       └── variables.tf    (Input variables)",
+            "   └── Stage2/",
+            "       └── main.tf         (ALB Controller setup)",
+            "\n",
+            "   ├── deployment.yaml (Application deployment)",
+            "   ├── service.yaml    (Service configuration)",
+            "   └── ingress.yaml    (Ingress configuration)",
+            "\n📁 .github/workflows/",
+            "   └── deploy.yml      (CI/CD pipeline)",
+            "\n📁 scripts/",
+            "   ├── setup.sh        (Environment setup)",
+            "   └── deploy.sh       (Application deployment)",
+            "\n",
+            "   └── Dockerfile      (Container configuration)",
+            "\n" + "="*60,
+            "Next Steps:",
+            "1. Review and customize the generated files",
+            "2. Set up AWS credentials and environment variables",
+            "3. Run: cd terraform && terraform init && terraform plan",
+            "4. Run: terraform apply",
+            "5. Configure kubectl: aws eks update-kubeconfig --region <region> --name <cluster-name>",
+            "6. Deploy application: kubectl apply -f k8s/",
+            "="*60
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def test_gemini_connection(self) -> bool:
-        """Test Gemini API connection"""
+        """Test Gemini API connection
+
+        Uses the synchronous client, so the async client stays free for the
+        event loop that run_full_pipeline() creates.
+        """
         try:
             test_prompt = "Say 'Hello, EKS automation pipeline!' and nothing else."
-            response = self._call_gemini_api(test_prompt)
-            self.logger.info(f"Gemini API test successful: {response}")
+            response = self._get_model().generate_content(
+                test_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    max_output_tokens=self._output_token_limit(64),
+                    temperature=self.config['temperature']
+                )
+            )
+            self.logger.info("Gemini API test successful: %s", response.text)
             return True
         except Exception as e:
-            self.logger.error(f"Gemini API test failed: {str(e)}")
+            self.logger.error("Gemini API test failed: %s", e)
             return False
 
 if __name__ == "__main__":
@@ -632,6 +1036,9 @@ if __name__ == "__main__":
         print("✅ Gemini API connection successful!")
         
         # Run full pipeline
-        pipeline.run_full_pipeline()
+        if pipeline.config['batch_mode']:
+            pipeline.run_full_pipeline_batch()
+        else:
+            pipeline.run_full_pipeline()
     else:
         print("❌ Gemini API connection failed!")
\ No newline at end of file